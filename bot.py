@@ -1,19 +1,41 @@
 import os
+import asyncio
+import functools
 import logging
-from telegram import Update, ChatPermissions
-from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
+from telegram import Update, ChatPermissions, MessageEntity
+from telegram.error import RetryAfter, TelegramError
+from telegram.helpers import escape_markdown
+from telegram.ext import Application, ChatMemberHandler, CommandHandler, ContextTypes, MessageHandler, filters
+from telegram.request import HTTPXRequest
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Render environment variables
 BOT_TOKEN = os.environ.get('BOT_TOKEN')
 ALERT_CHAT_ID = os.environ.get('ALERT_CHAT_ID')
 AUTHORIZED_USER_ID = os.environ.get('AUTHORIZED_USER_ID')  # Your Telegram user ID
+WEBHOOK_HOST = os.environ.get('RENDER_EXTERNAL_HOSTNAME')  # Set on Render web services only
+WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET')  # Checked against Telegram's secret header
+WEBHOOK_PATH = 'telegram-webhook'
+PORT = int(os.environ.get('PORT', '8443'))
+DROP_PENDING_UPDATES = os.environ.get('DROP_PENDING_UPDATES', '0') == '1'  # Skip backlog on start
 
 # Validate required environment variables
 if not BOT_TOKEN:
     raise ValueError("BOT_TOKEN environment variable is required")
 
+if WEBHOOK_HOST and not WEBHOOK_SECRET:
+    raise ValueError("WEBHOOK_SECRET environment variable is required for webhook mode")
+
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
@@ -21,19 +43,51 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Database setup
+DB_PATH = '/tmp/protection_bot.db'
+
+_db_conn = None
+# Guards the shared connection; held only around synchronous DB work, never
+# across an await
+_db_lock = threading.RLock()
+
+def get_db_connection():
+    """Return the single connection shared by every handler"""
+    # sqlite3 keeps compiled statements per connection, so reusing one lets
+    # the hot statements skip re-parsing and the page cache stays warm
+    global _db_conn
+    if _db_conn is None:
+        # check_same_thread is off because DB helpers run on the SQLite thread;
+        # _db_lock serialises access instead
+        _db_conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        # WAL lets readers proceed while a write is in progress; the rows are
+        # telemetry in /tmp, so NORMAL sync is durable enough
+        _db_conn.execute('PRAGMA journal_mode = WAL')
+        _db_conn.execute('PRAGMA synchronous = NORMAL')
+        _db_conn.execute('PRAGMA temp_store = MEMORY')
+        _db_conn.execute('PRAGMA cache_size = -64000')
+    return _db_conn
+
+# Dedicated thread for SQLite work, so DB calls don't queue behind other
+# blocking jobs in the loop's default executor. One worker is enough: the
+# shared connection serialises statements anyway
+_db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+
+async def run_db(func, *args):
+    """Run a blocking DB helper on the SQLite thread"""
+    return await asyncio.get_running_loop().run_in_executor(_db_executor, func, *args)
+
 def init_db():
-    conn = sqlite3.connect('/tmp/protection_bot.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
+    conn = get_db_connection()
+    # One script inside one transaction: a single commit instead of one per table
+    conn.executescript('''
+        BEGIN;
+
         CREATE TABLE IF NOT EXISTS groups (
             group_id INTEGER PRIMARY KEY,
             group_title TEXT,
             added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
+        );
+
         CREATE TABLE IF NOT EXISTS risky_messages (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             group_id INTEGER,
@@ -43,10 +97,8 @@ def init_db():
             risk_type TEXT,
             action_taken TEXT,
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
+        );
+
         CREATE TABLE IF NOT EXISTS user_warnings (
             user_id INTEGER,
             group_id INTEGER,
@@ -54,25 +106,125 @@ def init_db():
             last_warning TIMESTAMP,
             is_banned BOOLEAN DEFAULT FALSE,
             PRIMARY KEY (user_id, group_id)
-        )
-    ''')
-    
-    cursor.execute('''
+        );
+
         CREATE TABLE IF NOT EXISTS ban_alerts (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             group_id INTEGER,
             alert_type TEXT,
             alert_message TEXT,
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
+        );
+
+        -- Indexes for the /status, /warned and /alerts lookups. The last two
+        -- carry every selected column so those queries never touch the table
+        CREATE INDEX IF NOT EXISTS idx_risky_messages_group_id ON risky_messages(group_id);
+        CREATE INDEX IF NOT EXISTS idx_user_warnings_group_top ON user_warnings(group_id, warning_count DESC, user_id);
+        CREATE INDEX IF NOT EXISTS idx_ban_alerts_recent ON ban_alerts(timestamp DESC, alert_type);
+
+        COMMIT;
     ''')
     
-    conn.commit()
-    conn.close()
     logger.info("Database initialized successfully")
 
 init_db()
 
+# Statements run for every scanned message or flush. sqlite3 caches compiled
+# statements per connection keyed by their text, so each lives in one place
+UPSERT_GROUP_SQL = 'INSERT OR REPLACE INTO groups (group_id, group_title) VALUES (?, ?)'
+ADD_WARNING_SQL = '''
+    INSERT OR REPLACE INTO user_warnings 
+    (user_id, group_id, warning_count, last_warning)
+    VALUES (?, ?, COALESCE((SELECT warning_count FROM user_warnings WHERE user_id = ? AND group_id = ?), 0) + 1, ?)
+'''
+INSERT_RISKY_SQL = 'INSERT INTO risky_messages (group_id, user_id, username, message_text, risk_type, action_taken) VALUES (?, ?, ?, ?, ?, ?)'
+INSERT_ALERT_SQL = 'INSERT INTO ban_alerts (group_id, alert_type, alert_message) VALUES (?, ?, ?)'
+
+# Risky messages and sent alerts are buffered and written together in one
+# transaction, every FLUSH_INTERVAL seconds or once FLUSH_SIZE rows are waiting
+FLUSH_INTERVAL = 2
+FLUSH_SIZE = 100
+_risky_buffer = []  # risky_messages rows
+_alert_buffer = []  # ban_alerts rows
+# Rows kept per buffer while writes keep failing; the oldest go first
+MAX_PENDING_ROWS = 10000
+# Set by handlers to wake the flusher early once FLUSH_SIZE rows are waiting
+_flush_wakeup = asyncio.Event()
+
+def take_pending_writes():
+    """Detach the buffered rows, or return None when nothing is waiting"""
+    # Runs on the event loop so no handler can append between copy and clear
+    if not _risky_buffer and not _alert_buffer:
+        return None
+    
+    risky_rows = _risky_buffer[:]
+    alert_rows = _alert_buffer[:]
+    _risky_buffer.clear()
+    _alert_buffer.clear()
+    return risky_rows, alert_rows
+
+def restore_pending_writes(risky_rows, alert_rows):
+    """Put rows from a failed write back in front of anything buffered since"""
+    _risky_buffer[:0] = risky_rows
+    _alert_buffer[:0] = alert_rows
+    for buffer in (_risky_buffer, _alert_buffer):
+        overflow = len(buffer) - MAX_PENDING_ROWS
+        if overflow > 0:
+            del buffer[:overflow]
+            logger.warning("Dropped %d unwritten rows, database writes keep failing", overflow)
+
+def write_pending_rows(risky_rows, alert_rows):
+    """Write detached risky messages and alerts in a single transaction"""
+    conn = get_db_connection()
+    with _db_lock, conn:
+        conn.executemany(INSERT_RISKY_SQL, risky_rows)
+        conn.executemany(INSERT_ALERT_SQL, alert_rows)
+
+def flush_pending_writes():
+    """Write everything buffered, blocking the caller"""
+    pending = take_pending_writes()
+    if pending:
+        try:
+            write_pending_rows(*pending)
+        except Exception:
+            restore_pending_writes(*pending)
+            raise
+        invalidate_group_counts(row[0] for row in pending[0])
+
+async def flush_pending_writes_in_thread():
+    """Write everything buffered without blocking the event loop"""
+    pending = take_pending_writes()
+    if pending:
+        try:
+            await run_db(write_pending_rows, *pending)
+        except Exception:
+            # Restored on the loop, like take_pending_writes
+            restore_pending_writes(*pending)
+            raise
+        # Back on the loop, so this is ordered against fetch_group_counts
+        invalidate_group_counts(row[0] for row in pending[0])
+
+async def pending_write_flusher():
+    """Flush buffered writes periodically, or sooner when woken"""
+    while True:
+        try:
+            await asyncio.wait_for(_flush_wakeup.wait(), FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _flush_wakeup.clear()
+        flush = asyncio.ensure_future(flush_pending_writes_in_thread())
+        try:
+            await asyncio.shield(flush)
+        except asyncio.CancelledError:
+            # Let a write already in progress finish, so rows it detached
+            # are not lost when post_stop cancels the flusher
+            await asyncio.wait((flush,))
+            raise
+        except Exception as e:
+            logger.error("Pending write flush error: %s", e)
+            # Back off so a full buffer doesn't retry a failing write per message
+            await asyncio.sleep(FLUSH_INTERVAL)
+
 def is_authorized_user(user_id):
     """Check if user is authorized to use bot commands"""
     if not AUTHORIZED_USER_ID:
@@ -84,262 +236,421 @@ def is_authorized_user(user_id):
     except (ValueError, AttributeError):
         return str(user_id) == str(AUTHORIZED_USER_ID)
 
-async def authorized_only(func):
+ACCESS_DENIED_TEXT = (
+    "❌ *Access Denied*\n\n"
+    "You are not authorized to use this bot.\n"
+    "This bot is restricted to authorized users only."
+)
+
+def authorized_only(func):
     """Decorator to restrict command access to authorized users only"""
+    @functools.wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
         
         if not is_authorized_user(user_id):
-            logger.warning(f"Unauthorized access attempt from user {user_id}")
+            logger.warning("Unauthorized access attempt from user %s", user_id)
             
             # Only respond in private chat, ignore in groups
             if update.effective_chat.type == "private":
-                await update.message.reply_text(
-                    "❌ *Access Denied*\n\n"
-                    "You are not authorized to use this bot.\n"
-                    "This bot is restricted to authorized users only.",
-                    parse_mode='Markdown'
-                )
+                await update.message.reply_text(ACCESS_DENIED_TEXT, parse_mode='Markdown')
             return
         
         # User is authorized, proceed with the command
         return await func(update, context)
     return wrapper
 
+def handle_errors(label, error_reply=None):
+    """Decorator to log handler errors and optionally tell the user"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            try:
+                return await func(update, context)
+            except Exception as e:
+                logger.error("%s error: %s", label, e)
+                if error_reply:
+                    await update.message.reply_text(error_reply)
+        return wrapper
+    return decorator
+
 class BanProtection:
-    def __init__(self):
-        self.spam_keywords = [
-            'http://', 'https://', '.com', '.org', '.net', '.xyz',
-            'buy now', 'click here', 'limited offer', 'discount',
-            'make money', 'earn cash', 'work from home', 'investment',
-            'bitcoin', 'crypto', 'free money', 't.me/joinchat/'
-        ]
-        
-        self.bad_words = [
-            'fuck', 'shit', 'asshole', 'bitch', 'dick', 'porn',
-            'nude', 'sex', 'drugs', 'weed', 'cocaine', 'heroin'
-        ]
-        
-        self.scam_phrases = [
-            'send money', 'bank transfer', 'password', 'login',
-            'verify account', 'security check', 'admin contact',
-            'telegram support', 'official group', 'card number'
-        ]
+    # All state lives on the class; instances need no __dict__
+    __slots__ = ()
+    
+    # Every byte outside A-Z, deleted via bytes.translate to count ASCII capitals in C
+    _NON_UPPER_BYTES = bytes(i for i in range(256) if not 65 <= i <= 90)
+
+    # Keyword tables are lowercase tuples built once with the class
+    spam_keywords = (
+        'http://', 'https://', '.com', '.org', '.net', '.xyz',
+        'buy now', 'click here', 'limited offer', 'discount',
+        'make money', 'earn cash', 'work from home', 'investment',
+        'bitcoin', 'crypto', 'free money', 't.me/joinchat/'
+    )
+    
+    bad_words = (
+        'fuck', 'shit', 'asshole', 'bitch', 'dick', 'porn',
+        'nude', 'sex', 'drugs', 'weed', 'cocaine', 'heroin'
+    )
+    
+    scam_phrases = (
+        'send money', 'bank transfer', 'password', 'login',
+        'verify account', 'security check', 'admin contact',
+        'telegram support', 'official group', 'card number'
+    )
+    
+    # (keywords, (risk, level) for one match, (risk, level) for two or more),
+    # evaluated in order so a later match sets the final risk level
+    _KEYWORD_CHECKS = (
+        (spam_keywords, ("suspicious_link", "medium"), ("spam_links", "high")),
+        (bad_words, ("mild_inappropriate", "medium"), ("inappropriate_content", "high")),
+        (scam_phrases, ("scam_attempt", "high"), ("scam_attempt", "high")),
+    )
+    
+    # Shorter texts cannot contain any keyword and are below the caps threshold
+    _MIN_KEYWORD_LEN = min(len(k) for k in spam_keywords + bad_words + scam_phrases)
+    
+    @staticmethod
+    def _count_matches(keywords, text, limit=2):
+        """Count keywords found in text, stopping once limit is reached"""
+        count = 0
+        for keyword in keywords:
+            if keyword in text:
+                count += 1
+                if count >= limit:
+                    break
+        return count
     
     def check_message_risk(self, text):
         """Check message for ban risks"""
-        if not text:
+        if not text or len(text) < self._MIN_KEYWORD_LEN:
             return "safe", []
         
         text_lower = text.lower()
+        count_matches = self._count_matches
         risks = []
         risk_level = "safe"
         
-        # Check for spam
-        spam_count = sum(1 for keyword in self.spam_keywords if keyword in text_lower)
-        if spam_count >= 2:
-            risks.append("spam_links")
-            risk_level = "high"
-        elif spam_count == 1:
-            risks.append("suspicious_link")
-            risk_level = "medium"
-        
-        # Check for bad words
-        bad_word_count = sum(1 for word in self.bad_words if word in text_lower)
-        if bad_word_count >= 2:
-            risks.append("inappropriate_content")
-            risk_level = "high"
-        elif bad_word_count == 1:
-            risks.append("mild_inappropriate")
-            risk_level = "medium"
-        
-        # Check for scam phrases
-        if any(phrase in text_lower for phrase in self.scam_phrases):
-            risks.append("scam_attempt")
-            risk_level = "high"
+        # Check for spam, bad words and scam phrases
+        for keywords, single, multiple in self._KEYWORD_CHECKS:
+            match_count = count_matches(keywords, text_lower)
+            if match_count:
+                risk, risk_level = multiple if match_count >= 2 else single
+                risks.append(risk)
         
         # Check for excessive caps
         if len(text) > 10:
-            caps_count = sum(1 for char in text if char.isupper())
+            if text.isascii():
+                caps_count = len(text.encode('ascii').translate(None, self._NON_UPPER_BYTES))
+            else:
+                # Non-ASCII capitals (Cyrillic, Greek, ...) need str.isupper
+                caps_count = sum(map(str.isupper, text))
             if caps_count / len(text) > 0.7:
                 risks.append("caps_spam")
                 risk_level = "medium"
         
         return risk_level, risks
 
-async def send_ban_alert(context, group_title, username, user_id, message_text, risk_type, action_taken):
-    """Send ban risk alert to owner"""
-    try:
-        alert_msg = (
-            f"🚨 *BAN RISK ALERT*\n\n"
-            f"*Group:* {group_title}\n"
-            f"*User:* @{username or 'No username'} (ID: `{user_id}`)\n"
-            f"*Risk Type:* {risk_type}\n"
-            f"*Action Taken:* {action_taken}\n"
-            f"*Message:* {message_text[:200]}\n\n"
-            f"⏰ *Time:* {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        )
-        
-        await context.bot.send_message(
-            chat_id=ALERT_CHAT_ID,
-            text=alert_msg,
-            parse_mode='Markdown'
-        )
-        
-        # Save alert to database
-        conn = sqlite3.connect('/tmp/protection_bot.db')
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO ban_alerts (group_id, alert_type, alert_message) VALUES (?, ?, ?)',
-            (user_id, risk_type, alert_msg)
-        )
-        conn.commit()
-        conn.close()
-        
-        logger.info(f"Alert sent for {risk_type} in {group_title}")
-        
-    except Exception as e:
-        logger.error(f"Alert error: {e}")
+ban_protection = BanProtection()
+
+# Bot admin status per chat, refreshed at most once per TTL and updated
+# directly from my_chat_member updates when the bot's role changes
+BOT_ADMIN_CACHE_TTL = 300
+_bot_admin_cache = {}  # chat_id -> (checked_at, is_admin)
+
+async def is_bot_admin(chat, bot_id):
+    """Check if the bot is an admin in chat, reusing a recent answer"""
+    now = time.monotonic()
+    cached = _bot_admin_cache.get(chat.id)
+    if cached and now - cached[0] < BOT_ADMIN_CACHE_TTL:
+        return cached[1]
+    
+    bot_member = await chat.get_member(bot_id)
+    is_admin = bot_member.status in ['administrator', 'creator']
+    _bot_admin_cache[chat.id] = (now, is_admin)
+    return is_admin
+
+async def track_bot_membership(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Refresh the admin cache when the bot is promoted, demoted or removed"""
+    member_update = update.my_chat_member
+    is_admin = member_update.new_chat_member.status in ['administrator', 'creator']
+    _bot_admin_cache[member_update.chat.id] = (time.monotonic(), is_admin)
+
+# Owner alert throttling: one alert per (group, user) per cooldown window
+ALERT_COOLDOWN_SECONDS = 60
+ALERT_HISTORY_SIZE = 256
+_alert_history = OrderedDict()  # (chat_id, user_id) -> [last_sent, suppressed]
+_alert_queue = asyncio.Queue()  # (chat_id, group_title, risk_type, alert_msg, entities)
+
+def build_alert_message(group_title, username, user_id, message_text, risk_type, action_taken, suppressed):
+    """Return alert text and its formatting entities"""
+    # Formatting is sent as explicit entities, so user-controlled text needs
+    # no escaping and Telegram has no markup to parse
+    bold = MessageEntity.BOLD
+    segments = [
+        ("🚨 ", None), ("BAN RISK ALERT", bold), ("\n\n", None),
+        ("Group:", bold), (f" {group_title or ''}\n", None),
+        ("User:", bold), (f" @{username or 'No username'} (ID: ", None),
+        (str(user_id), MessageEntity.CODE), (")\n", None),
+        ("Risk Type:", bold), (f" {risk_type}\n", None),
+        ("Action Taken:", bold), (f" {action_taken}\n", None),
+        ("Message:", bold), (f" {message_text[:200]}\n\n", None),
+        ("⏰ ", None), ("Time:", bold), (f" {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", None),
+    ]
+    if suppressed:
+        segments += [
+            ("\n", None),
+            ("Risky messages from this user since last alert:", bold),
+            (f" {suppressed}", None),
+        ]
+    
+    parts = []
+    entities = []
+    offset = 0  # Entity offsets are counted in UTF-16 code units
+    for segment, entity_type in segments:
+        length = len(segment.encode('utf-16-le')) // 2
+        if entity_type:
+            entities.append(MessageEntity(entity_type, offset, length))
+        parts.append(segment)
+        offset += length
+    return "".join(parts), entities
+
+def send_ban_alert(chat_id, group_title, username, user_id, message_text, risk_type, action_taken):
+    """Queue a ban risk alert for the owner"""
+    # Without a destination every send fails after a full API round-trip
+    if not ALERT_CHAT_ID:
+        return
+    
+    # Collapse a spammer's burst into a single counted alert
+    key = (chat_id, user_id)
+    now = time.monotonic()
+    entry = _alert_history.get(key)
+    if entry and now - entry[0] < ALERT_COOLDOWN_SECONDS:
+        entry[1] += 1
+        return
+    suppressed = entry[1] if entry else 0
+    _alert_history[key] = [now, 0]
+    _alert_history.move_to_end(key)
+    if len(_alert_history) > ALERT_HISTORY_SIZE:
+        _alert_history.popitem(last=False)
+    
+    alert_msg, entities = build_alert_message(
+        group_title, username, user_id, message_text, risk_type, action_taken, suppressed
+    )
+    
+    # Delivered by alert_sender so a flood-limited send never blocks the handler
+    _alert_queue.put_nowait((chat_id, group_title, risk_type, alert_msg, entities))
+
+async def alert_sender(bot):
+    """Deliver queued owner alerts one at a time, pausing on flood control"""
+    while True:
+        chat_id, group_title, risk_type, alert_msg, entities = await _alert_queue.get()
+        try:
+            while True:
+                try:
+                    await bot.send_message(
+                        chat_id=ALERT_CHAT_ID,
+                        text=alert_msg,
+                        entities=entities
+                    )
+                    break
+                except RetryAfter as e:
+                    # Hold the whole queue until Telegram's flood window ends
+                    logger.warning("Alert rate limited, retrying in %ss", e.retry_after)
+                    await asyncio.sleep(e.retry_after)
+            
+            # Queue alert for the next batched write
+            _alert_buffer.append((chat_id, risk_type, alert_msg))
+            
+            logger.info("Alert sent for %s in %s", risk_type, group_title)
+            
+        except Exception as e:
+            logger.error("Alert error: %s", e)
+        finally:
+            _alert_queue.task_done()
+
+WELCOME_PRIVATE_TEXT = (
+    "🛡️ *Group Protection Bot*\n\n"
+    "*I protect your groups from ban risks!*\n\n"
+    "*Commands:*\n"
+    "/start - Show this menu\n"
+    "/status - Protection status\n"
+    "/alerts - Recent ban alerts\n"
+    "/stats - Protection statistics\n"
+    "/warned - List warned users\n\n"
+    "*Features:*\n"
+    "• Auto-detect spam & scams\n"
+    "• Remove inappropriate content\n"
+    "• Alert owner of ban risks\n"
+    "• Track warned users\n\n"
+    "Add me to your group as ADMIN to enable full protection!"
+)
+
+WELCOME_GROUP_TEXT = (
+    "🛡️ *Protection Activated!*\n\n"
+    "I'm now monitoring this group for ban risks.\n"
+    "I will delete risky messages and alert the owner.\n\n"
+    "Use /status to check protection status."
+)
+
+GROUPS_ONLY_TEXT = "❌ *This command works in groups only!*"
+
+# SQLite calls block, so the handlers below run them through
+# run_db and keep the event loop serving other chats
+
+def save_group(group_id, title):
+    """Insert or refresh a group row"""
+    conn = get_db_connection()
+    with _db_lock, conn:
+        conn.execute(UPSERT_GROUP_SQL, (group_id, title))
 
 @authorized_only
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command - Authorized users only"""
     if update.effective_chat.type == "private":
-        await update.message.reply_text(
-            "🛡️ *Group Protection Bot*\n\n"
-            "*I protect your groups from ban risks!*\n\n"
-            "*Commands:*\n"
-            "/start - Show this menu\n"
-            "/status - Protection status\n"
-            "/alerts - Recent ban alerts\n"
-            "/stats - Protection statistics\n"
-            "/warned - List warned users\n\n"
-            "*Features:*\n"
-            "• Auto-detect spam & scams\n"
-            "• Remove inappropriate content\n"
-            "• Alert owner of ban risks\n"
-            "• Track warned users\n\n"
-            "Add me to your group as ADMIN to enable full protection!",
-            parse_mode='Markdown'
-        )
+        await update.message.reply_text(WELCOME_PRIVATE_TEXT, parse_mode='Markdown')
     else:
-        # Save group info
-        conn = sqlite3.connect('/tmp/protection_bot.db')
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT OR REPLACE INTO groups (group_id, group_title) VALUES (?, ?)',
-            (update.effective_chat.id, update.effective_chat.title)
+        # Save group info while the welcome goes out; neither needs the other
+        await asyncio.gather(
+            run_db(save_group, update.effective_chat.id, update.effective_chat.title),
+            update.message.reply_text(WELCOME_GROUP_TEXT, parse_mode='Markdown')
         )
-        conn.commit()
-        conn.close()
-        
-        await update.message.reply_text(
-            "🛡️ *Protection Activated!*\n\n"
-            "I'm now monitoring this group for ban risks.\n"
-            "I will delete risky messages and alert the owner.\n\n"
-            "Use /status to check protection status.",
-            parse_mode='Markdown'
+
+# is_admin (None when the check failed) -> (bot status label, footer line)
+STATUS_LINES = {
+    True: ("✅ Admin", "*✅ Full protection enabled!*"),
+    False: ("❌ Not Admin", "*⚠️ Make me ADMIN for full protection!*"),
+    None: ("❓ Unknown", "*✅ Full protection enabled!*"),
+}
+
+STATUS_TEMPLATE = (
+    "🛡️ *Protection Status*\n\n"
+    "*Group:* %s\n"
+    "*Bot Status:* %s\n"
+    "*Risky Messages Blocked:* %d\n"
+    "*Users Warned:* %d\n"
+    "*Alerts Sent:* ✅ Active\n\n"
+    "%s"
+)
+
+def get_group_counts(group_id):
+    """Return (risky messages, warned users) for a group in one statement"""
+    with _db_lock:
+        cursor = get_db_connection().execute(
+            '''
+            SELECT
+                (SELECT COUNT(*) FROM risky_messages WHERE group_id = :group_id),
+                (SELECT COUNT(*) FROM user_warnings WHERE group_id = :group_id)
+            ''',
+            {'group_id': group_id}
         )
+        return cursor.fetchone()
+
+# /status counts per group, reused for a short TTL and dropped whenever
+# new rows for the group are written
+GROUP_COUNTS_CACHE_TTL = 30
+_group_counts_cache = {}  # group_id -> (fetched_at, (risky, warned))
+_group_counts_generation = {}  # group_id -> number of invalidations
+
+def invalidate_group_counts(group_ids):
+    """Drop cached counts for groups that just had rows written"""
+    for group_id in set(group_ids):
+        _group_counts_cache.pop(group_id, None)
+        _group_counts_generation[group_id] = _group_counts_generation.get(group_id, 0) + 1
+
+async def fetch_group_counts(group_id):
+    """Return cached group counts, querying SQLite off the event loop on a miss"""
+    now = time.monotonic()
+    cached = _group_counts_cache.get(group_id)
+    if cached and now - cached[0] < GROUP_COUNTS_CACHE_TTL:
+        return cached[1]
+    
+    generation = _group_counts_generation.get(group_id, 0)
+    counts = await run_db(get_group_counts, group_id)
+    # A write that landed during the query may not be counted; don't cache it
+    if _group_counts_generation.get(group_id, 0) == generation:
+        _group_counts_cache[group_id] = (now, counts)
+    return counts
 
 @authorized_only
+@handle_errors("Status", "❌ Error getting status")
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Protection status - Authorized users only"""
     if update.effective_chat.type == "private":
-        await update.message.reply_text("❌ *This command works in groups only!*", parse_mode='Markdown')
+        await update.message.reply_text(GROUPS_ONLY_TEXT, parse_mode='Markdown')
         return
     
-    try:
-        conn = sqlite3.connect('/tmp/protection_bot.db')
-        cursor = conn.cursor()
-        
-        # Get stats for this group
-        cursor.execute(
-            'SELECT COUNT(*) FROM risky_messages WHERE group_id = ?',
-            (update.effective_chat.id,)
-        )
-        risky_count = cursor.fetchone()[0] or 0
-        
-        cursor.execute(
-            'SELECT COUNT(*) FROM user_warnings WHERE group_id = ?',
-            (update.effective_chat.id,)
-        )
-        warned_users = cursor.fetchone()[0] or 0
-        
-        # Check if bot is admin
-        try:
-            bot_member = await update.effective_chat.get_member(context.bot.id)
-            is_admin = bot_member.status in ['administrator', 'creator']
-            admin_status = "✅ Admin" if is_admin else "❌ Not Admin"
-        except Exception as e:
-            logger.error(f"Admin check error: {e}")
-            admin_status = "❓ Unknown"
-        
-        status_msg = (
-            f"🛡️ *Protection Status*\n\n"
-            f"*Group:* {update.effective_chat.title}\n"
-            f"*Bot Status:* {admin_status}\n"
-            f"*Risky Messages Blocked:* {risky_count}\n"
-            f"*Users Warned:* {warned_users}\n"
-            f"*Alerts Sent:* ✅ Active\n\n"
-        )
-        
-        if admin_status == "❌ Not Admin":
-            status_msg += "*⚠️ Make me ADMIN for full protection!*"
-        else:
-            status_msg += "*✅ Full protection enabled!*"
-        
-        await update.message.reply_text(status_msg, parse_mode='Markdown')
-        
-    except Exception as e:
-        logger.error(f"Status error: {e}")
-        await update.message.reply_text("❌ Error getting status")
-    finally:
-        conn.close()
+    # The DB lookup and the admin check are independent, so overlap them
+    counts, is_admin = await asyncio.gather(
+        fetch_group_counts(update.effective_chat.id),
+        is_bot_admin(update.effective_chat, context.bot.id),
+        return_exceptions=True
+    )
+    if isinstance(counts, Exception):
+        raise counts
+    risky_count, warned_users = counts
+    
+    if isinstance(is_admin, Exception):
+        logger.error("Admin check error: %s", is_admin)
+        is_admin = None
+    
+    admin_status, footer = STATUS_LINES[is_admin]
+    status_msg = STATUS_TEMPLATE % (
+        escape_markdown(update.effective_chat.title or '', version=1),
+        admin_status, risky_count, warned_users, footer
+    )
+    
+    await update.message.reply_text(status_msg, parse_mode='Markdown')
 
-@authorized_only
-async def alerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Recent ban alerts - Authorized users only"""
-    try:
-        conn = sqlite3.connect('/tmp/protection_bot.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT alert_type, alert_message, timestamp 
+def get_recent_alerts():
+    """Return (alert_type, timestamp) for the five newest alerts"""
+    with _db_lock:
+        cursor = get_db_connection().execute('''
+            SELECT alert_type, timestamp 
             FROM ban_alerts 
             ORDER BY timestamp DESC 
             LIMIT 5
         ''')
-        
-        recent_alerts = cursor.fetchall()
-        
-        if not recent_alerts:
-            await update.message.reply_text("📊 *No alerts yet!*", parse_mode='Markdown')
-            return
-        
-        response = "🚨 *Recent Ban Alerts*\n\n"
-        
-        for alert_type, alert_msg, timestamp in recent_alerts:
-            time_ago = datetime.now() - datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-            hours_ago = int(time_ago.total_seconds() / 3600)
-            
-            response += f"• *{alert_type}* - {hours_ago}h ago\n"
-        
-        response += f"\n*Total alerts sent to owner:* {len(recent_alerts)}"
-        
-        await update.message.reply_text(response, parse_mode='Markdown')
-        
-    except Exception as e:
-        logger.error(f"Alerts error: {e}")
-        await update.message.reply_text("❌ Error getting alerts")
-    finally:
-        conn.close()
+        return cursor.fetchall()
 
 @authorized_only
-async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Protection statistics - Authorized users only"""
-    try:
-        conn = sqlite3.connect('/tmp/protection_bot.db')
-        cursor = conn.cursor()
+@handle_errors("Alerts", "❌ Error getting alerts")
+async def alerts(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Recent ban alerts - Authorized users only"""
+    recent_alerts = await run_db(get_recent_alerts)
+    
+    if not recent_alerts:
+        await update.message.reply_text("📊 *No alerts yet!*", parse_mode='Markdown')
+        return
+    
+    lines = ["🚨 *Recent Ban Alerts*\n\n"]
+    now = datetime.now()
+    
+    for alert_type, timestamp in recent_alerts:
+        time_ago = now - datetime.fromisoformat(timestamp)
+        hours_ago = int(time_ago.total_seconds() / 3600)
+        
+        lines.append(f"• *{alert_type}* - {hours_ago}h ago\n")
+    
+    lines.append(f"\n*Total alerts sent to owner:* {len(recent_alerts)}")
+    response = "".join(lines)
+    
+    await update.message.reply_text(response, parse_mode='Markdown')
+
+STATS_TEMPLATE = (
+    "📊 *Protection Statistics*\n\n"
+    "*Protected Groups:* %d\n"
+    "*Messages Blocked:* %d\n"
+    "*Users Warned:* %d\n"
+    "*Alerts Sent:* %d\n\n"
+    "*Last Update:* %s"
+)
+
+def get_totals():
+    """Return (groups, blocked messages, warned users, alerts) across all groups"""
+    with _db_lock:
+        cursor = get_db_connection().cursor()
         
         cursor.execute('SELECT COUNT(*) FROM groups')
         protected_groups = cursor.fetchone()[0] or 0
@@ -352,175 +663,291 @@ async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         cursor.execute('SELECT COUNT(*) FROM ban_alerts')
         total_alerts = cursor.fetchone()[0] or 0
-        
-        stats_msg = (
-            f"📊 *Protection Statistics*\n\n"
-            f"*Protected Groups:* {protected_groups}\n"
-            f"*Messages Blocked:* {total_blocked}\n"
-            f"*Users Warned:* {total_warned}\n"
-            f"*Alerts Sent:* {total_alerts}\n\n"
-            f"*Last Update:* {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-        )
-        
-        await update.message.reply_text(stats_msg, parse_mode='Markdown')
-        
-    except Exception as e:
-        logger.error(f"Stats error: {e}")
-        await update.message.reply_text("❌ Error getting statistics")
-    finally:
-        conn.close()
+    
+    return protected_groups, total_blocked, total_warned, total_alerts
 
 @authorized_only
-async def warned(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """List warned users - Authorized users only"""
-    if update.effective_chat.type == "private":
-        await update.message.reply_text("❌ *This command works in groups only!*", parse_mode='Markdown')
-        return
+@handle_errors("Stats", "❌ Error getting statistics")
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Protection statistics - Authorized users only"""
+    totals = await run_db(get_totals)
     
-    try:
-        conn = sqlite3.connect('/tmp/protection_bot.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT user_id, warning_count, last_warning 
+    stats_msg = STATS_TEMPLATE % (
+        *totals,
+        datetime.now().strftime('%Y-%m-%d %H:%M')
+    )
+    
+    await update.message.reply_text(stats_msg, parse_mode='Markdown')
+
+def get_warned_users(group_id):
+    """Return (user_id, warning_count) for the ten most-warned users in a group"""
+    with _db_lock:
+        cursor = get_db_connection().execute('''
+            SELECT user_id, warning_count 
             FROM user_warnings 
             WHERE group_id = ? 
             ORDER BY warning_count DESC 
             LIMIT 10
-        ''', (update.effective_chat.id,))
-        
-        warned_users = cursor.fetchall()
-        
-        if not warned_users:
-            await update.message.reply_text("✅ *No warned users in this group!*", parse_mode='Markdown')
-            return
-        
-        response = "⚠️ *Warned Users*\n\n"
-        
-        for user_id, count, last_warn in warned_users:
-            response += f"• User `{user_id}`: {count} warnings\n"
-        
-        response += f"\n*Total warned users:* {len(warned_users)}"
-        
-        await update.message.reply_text(response, parse_mode='Markdown')
-        
-    except Exception as e:
-        logger.error(f"Warned error: {e}")
-        await update.message.reply_text("❌ Error getting warned users")
-    finally:
-        conn.close()
+        ''', (group_id,))
+        return cursor.fetchall()
+
+@authorized_only
+@handle_errors("Warned", "❌ Error getting warned users")
+async def warned(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """List warned users - Authorized users only"""
+    if update.effective_chat.type == "private":
+        await update.message.reply_text(GROUPS_ONLY_TEXT, parse_mode='Markdown')
+        return
+    
+    warned_users = await run_db(get_warned_users, update.effective_chat.id)
+    
+    if not warned_users:
+        await update.message.reply_text("✅ *No warned users in this group!*", parse_mode='Markdown')
+        return
+    
+    lines = ["⚠️ *Warned Users*\n\n"]
+    
+    for user_id, count in warned_users:
+        lines.append(f"• User `{user_id}`: {count} warnings\n")
+    
+    lines.append(f"\n*Total warned users:* {len(warned_users)}")
+    response = "".join(lines)
+    
+    await update.message.reply_text(response, parse_mode='Markdown')
+
+GROUP_CHAT_TYPES = frozenset(("group", "supergroup"))
+
+# Group titles already written by protect_messages: group_id -> title
+_known_group_titles = {}
 
+def record_group_activity(group_id, new_title=None, warned_user_id=None):
+    """Save a changed group title and/or a user warning in one transaction"""
+    conn = get_db_connection()
+    with _db_lock, conn:
+        if new_title is not None:
+            conn.execute(UPSERT_GROUP_SQL, (group_id, new_title))
+        if warned_user_id is not None:
+            # Add user warning
+            conn.execute(
+                ADD_WARNING_SQL,
+                (warned_user_id, group_id, warned_user_id, group_id, datetime.now())
+            )
+
+@handle_errors("Protection")
 async def protect_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Monitor and protect against ban risks - Works for everyone in groups"""
-    if not update.message or not update.effective_user:
+    message = update.message
+    user = update.effective_user
+    if not message or not user:
         return
     
-    if update.effective_chat.type not in ["group", "supergroup"]:
+    chat = update.effective_chat
+    if chat.type not in GROUP_CHAT_TYPES:
         return
+    chat_id = chat.id
+    chat_title = chat.title
     
-    try:
-        # Save group info
-        conn = sqlite3.connect('/tmp/protection_bot.db')
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT OR REPLACE INTO groups (group_id, group_title) VALUES (?, ?)',
-            (update.effective_chat.id, update.effective_chat.title)
-        )
-        
-        protection = BanProtection()
-        message_text = update.message.text or update.message.caption or ""
-        
-        risk_level, risks = protection.check_message_risk(message_text)
-        
-        if risk_level != "safe":
-            # Save risky message
-            cursor.execute(
-                'INSERT INTO risky_messages (group_id, user_id, username, message_text, risk_type, action_taken) VALUES (?, ?, ?, ?, ?, ?)',
-                (update.effective_chat.id, update.effective_user.id, update.effective_user.username, message_text, ', '.join(risks), "Monitoring")
-            )
-            
-            action_taken = "Monitoring"
-            
-            # Try to delete message if bot is admin
-            try:
-                bot_member = await update.effective_chat.get_member(context.bot.id)
-                if bot_member.status in ['administrator', 'creator']:
-                    await update.message.delete()
-                    action_taken = "Message deleted"
-                    
-                    # Update action taken in database
-                    cursor.execute(
-                        'UPDATE risky_messages SET action_taken = ? WHERE group_id = ? AND user_id = ? AND message_text = ?',
-                        (action_taken, update.effective_chat.id, update.effective_user.id, message_text)
-                    )
-                    
-                    # Add user warning
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO user_warnings 
-                        (user_id, group_id, warning_count, last_warning)
-                        VALUES (?, ?, COALESCE((SELECT warning_count FROM user_warnings WHERE user_id = ? AND group_id = ?), 0) + 1, ?)
-                    ''', (update.effective_user.id, update.effective_chat.id, update.effective_user.id, update.effective_chat.id, datetime.now()))
-            except Exception as e:
-                logger.error(f"Delete failed: {e}")
-                action_taken = "Delete failed (need admin)"
-            
-            # Send alert to owner
-            await send_ban_alert(
-                context,
-                update.effective_chat.title,
-                update.effective_user.username,
-                update.effective_user.id,
-                message_text,
-                ', '.join(risks),
-                action_taken
-            )
+    # Save group info only when the group is new or its title changed
+    group_changed = _known_group_titles.get(chat_id) != chat_title
+    add_warning = False
+    
+    message_text = message.text or message.caption or ""
+    
+    # Stickers, photos without captions etc. have nothing to scan
+    if message_text:
+        risk_level, risks = ban_protection.check_message_risk(message_text)
+    else:
+        risk_level, risks = "safe", []
+    
+    if risk_level != "safe":
+        risk_type = ', '.join(risks)
+        action_taken = "Monitoring"
         
-        conn.commit()
-        conn.close()
+        # Try to delete message if bot is admin
+        try:
+            if await is_bot_admin(chat, context.bot.id):
+                await message.delete()
+                action_taken = "Message deleted"
+                add_warning = True
+        except Exception as e:
+            logger.error("Delete failed: %s", e)
+            action_taken = "Delete failed (need admin)"
         
-    except Exception as e:
-        logger.error(f"Protection error: {e}")
+        # Queue risky message once the final action is known
+        _risky_buffer.append(
+            (chat_id, user.id, user.username, message_text, risk_type, action_taken)
+        )
+        if len(_risky_buffer) >= FLUSH_SIZE:
+            _flush_wakeup.set()
+        
+        # Send alert to owner
+        send_ban_alert(
+            chat_id,
+            chat_title,
+            user.username,
+            user.id,
+            message_text,
+            risk_type,
+            action_taken
+        )
+    
+    # Both writes go in one transaction after the awaits, so the shared
+    # connection is never left mid-transaction while other handlers run
+    if group_changed or add_warning:
+        await run_db(
+            record_group_activity,
+            chat_id,
+            chat_title if group_changed else None,
+            user.id if add_warning else None
+        )
+        if add_warning:
+            invalidate_group_counts((chat_id,))
+    if group_changed:
+        _known_group_titles[chat_id] = chat_title
+
+# Group messages with something to scan, so private chats, stickers and
+# service messages never reach protect_messages
+PROTECT_FILTER = (filters.TEXT | filters.CAPTION) & ~filters.COMMAND & filters.ChatType.GROUPS
+
+# Only the update kinds the handlers use: new messages (commands and
+# protection) and the bot's own membership changes. Telegram drops the rest
+# before they reach getUpdates or the webhook
+ALLOWED_UPDATES = [Update.MESSAGE, Update.MY_CHAT_MEMBER]
+
+# Outgoing Bot API requests: connections kept open, and how long a request may
+# wait for one before PTB raises
+REQUEST_POOL_SIZE = 256
+REQUEST_POOL_TIMEOUT = 30
+
+class OrjsonRequest(HTTPXRequest):
+    """HTTPXRequest that decodes Bot API responses with orjson"""
+    
+    @staticmethod
+    def parse_json_payload(payload: bytes):
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError as exc:
+            raise TelegramError("Invalid server response") from exc
+
+# How long shutdown waits for queued owner alerts to go out
+ALERT_DRAIN_TIMEOUT = 10
+_alert_sender_task = None
+_flusher_task = None
+
+async def post_init(application: Application):
+    """Start background workers once the application is initialized"""
+    global _alert_sender_task, _flusher_task
+    # The application isn't running yet, so PTB would not track tasks from
+    # application.create_task; keep the handles and stop them in post_stop
+    _alert_sender_task = asyncio.create_task(alert_sender(application.bot))
+    _flusher_task = asyncio.create_task(pending_write_flusher())
+
+async def post_stop(application: Application):
+    """Stop the background workers, delivering queued alerts first"""
+    # Stop periodic flushing first; post_shutdown writes whatever is left
+    _flusher_task.cancel()
+    try:
+        await _flusher_task
+    except asyncio.CancelledError:
+        pass
+    
+    try:
+        await asyncio.wait_for(_alert_queue.join(), ALERT_DRAIN_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Dropping %d queued alerts at shutdown", _alert_queue.qsize())
+    
+    _alert_sender_task.cancel()
+    try:
+        await _alert_sender_task
+    except asyncio.CancelledError:
+        pass
+
+async def post_shutdown(application: Application):
+    """Write anything still buffered before the process exits"""
+    flush_pending_writes()
+    _db_executor.shutdown()
 
 def main():
     """Start the protection bot"""
     logger.info("🛡️ Starting Ban Protection Bot...")
-    logger.info(f"✅ BOT_TOKEN: {'Set' if BOT_TOKEN else 'Not Set'}")
-    logger.info(f"✅ ALERT_CHAT_ID: {'Set' if ALERT_CHAT_ID else 'Not Set'}")
-    logger.info(f"✅ AUTHORIZED_USER_ID: {'Set' if AUTHORIZED_USER_ID else 'Not Set'}")
+    logger.info("✅ BOT_TOKEN: %s", 'Set' if BOT_TOKEN else 'Not Set')
+    logger.info("✅ ALERT_CHAT_ID: %s", 'Set' if ALERT_CHAT_ID else 'Not Set')
+    logger.info("✅ AUTHORIZED_USER_ID: %s", 'Set' if AUTHORIZED_USER_ID else 'Not Set')
     
     if ALERT_CHAT_ID:
-        logger.info(f"📧 Alerts will be sent to: {ALERT_CHAT_ID}")
+        logger.info("📧 Alerts will be sent to: %s", ALERT_CHAT_ID)
     
     if AUTHORIZED_USER_ID:
-        logger.info(f"🔐 Authorized user: {AUTHORIZED_USER_ID}")
+        logger.info("🔐 Authorized user: %s", AUTHORIZED_USER_ID)
     else:
         logger.warning("⚠️  AUTHORIZED_USER_ID not set - all users will have access")
     
+    # libuv-based loop when available; must be set before PTB creates its loop
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("⚡ Using uvloop event loop")
+    except ImportError:
+        logger.info("uvloop not installed, using default asyncio loop")
+    
     # Create application
-    application = Application.builder().token(BOT_TOKEN).build()
-
-    # Add command handlers (authorized only)
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("status", status))
-    application.add_handler(CommandHandler("alerts", alerts))
-    application.add_handler(CommandHandler("stats", stats))
-    application.add_handler(CommandHandler("warned", warned))
-    
-    # Add message protection handler (works for everyone in groups)
-    application.add_handler(MessageHandler(
-        filters.ALL & ~filters.COMMAND, 
-        protect_messages
+    # Every update and API response is JSON; orjson parses it in C
+    request_class = OrjsonRequest if orjson else HTTPXRequest
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        # Replies, deletes and alerts share HTTP/2 connections to the Bot API;
+        # a burst waits for a free slot instead of failing after one second
+        .request(request_class(
+            connection_pool_size=REQUEST_POOL_SIZE,
+            pool_timeout=REQUEST_POOL_TIMEOUT,
+            connect_timeout=10,
+            read_timeout=10,
+            http_version='2',
+        ))
+        .get_updates_request(request_class())
+        .build()
+    )
+
+    application.add_handlers((
+        # Command handlers (authorized only)
+        CommandHandler("start", start),
+        CommandHandler("status", status),
+        CommandHandler("alerts", alerts),
+        CommandHandler("stats", stats),
+        CommandHandler("warned", warned),
+        # Keep cached admin status in sync with the bot's own role changes
+        ChatMemberHandler(track_bot_membership, ChatMemberHandler.MY_CHAT_MEMBER),
+        # Message protection handler (works for everyone in groups)
+        MessageHandler(PROTECT_FILTER, protect_messages),
     ))
 
     # Start the bot
     try:
         logger.info("✅ Bot is running and monitoring...")
-        application.run_polling(
-            drop_pending_updates=True,
-            allowed_updates=Update.ALL_TYPES
-        )
+        if WEBHOOK_HOST:
+            # Telegram pushes updates, so the bot sits idle between messages.
+            # Requests without the matching secret header are rejected, and
+            # the token stays out of the URL and any access logs
+            application.run_webhook(
+                listen='0.0.0.0',
+                port=PORT,
+                url_path=WEBHOOK_PATH,
+                webhook_url=f"https://{WEBHOOK_HOST}/{WEBHOOK_PATH}",
+                secret_token=WEBHOOK_SECRET,
+                drop_pending_updates=DROP_PENDING_UPDATES,
+                allowed_updates=ALLOWED_UPDATES
+            )
+        else:
+            application.run_polling(
+                drop_pending_updates=DROP_PENDING_UPDATES,
+                allowed_updates=ALLOWED_UPDATES
+            )
     except Exception as e:
-        logger.error(f"Bot failed to start: {e}")
+        logger.error("Bot failed to start: %s", e)
         raise
 
 if __name__ == '__main__':
@@ -1,7 +1,9 @@
 import os
+from functools import lru_cache
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 def get_database_url():
     """Get database URL with proper formatting for Render"""
@@ -16,18 +18,47 @@ def get_database_url():
     
     return database_url
 
-# Create engine with connection pooling for Render
-engine = create_engine(
-    get_database_url(),
-    pool_size=5,
-    max_overflow=10,
-    pool_pre_ping=True,  # Check connection before using
-    pool_recycle=300,    # Recycle connections after 5 minutes
-)
+@lru_cache(maxsize=None)
+def get_engine():
+    """Create the engine on first use, so importing this module needs no DATABASE_URL"""
+    database_url = get_database_url()
+    
+    # SQLite gains nothing from a pool or pre-ping probes: share one connection
+    if database_url.startswith("sqlite"):
+        return create_engine(
+            database_url,
+            connect_args={"check_same_thread": False, "timeout": 30},
+            poolclass=StaticPool,
+        )
+    
+    # Create engine with connection pooling for Render
+    return create_engine(
+        database_url,
+        pool_size=5,
+        max_overflow=10,
+        pool_pre_ping=True,  # Check connection before using
+        pool_recycle=300,    # Recycle connections after 5 minutes
+    )
+
+@lru_cache(maxsize=None)
+def get_session_factory():
+    """Return the sessionmaker bound to the shared engine"""
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+def __getattr__(name):
+    """Keep `engine` and `SessionLocal` importable, built on first access"""
+    if name == 'engine':
+        return get_engine()
+    if name == 'SessionLocal':
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_session():
+    """Open a session on the shared engine"""
+    return get_session_factory()()
+
 def init_db():
     """Initialize database tables"""
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())